@@ -1,16 +1,32 @@
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Dict, Any
-from .scoring import score_with_llm
+from .scoring import score_with_llm, close_client
 
-app = FastAPI(title="PeerReview AI — Heurístico MVP", version="0.1.0")
+app = FastAPI(title="PeerReview AI — Heurístico MVP", version="0.1.0", default_response_class=ORJSONResponse)
 
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
 
+# Limites de tamanho da submissão: evitam que um POST gigante consuma CPU/memória
+# e gere uma chamada ao Gemini que falharia de qualquer forma
+MAX_TEXT_CHARS = 200_000
+MAX_BODY_BYTES = 500_000
+
+@app.middleware("http")
+async def limit_body_size(request: Request, call_next):
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > MAX_BODY_BYTES:
+        return ORJSONResponse({"error": "Texto muito grande para análise."}, status_code=413)
+    return await call_next(request)
+
+@app.on_event("shutdown")
+async def shutdown():
+    await close_client()
+
 # Definir as dimensões aqui no main.py, pois elas não são mais importadas de scoring.py
 DIMENSIONS = [
     "Relevância e Originalidade",
@@ -21,9 +37,9 @@ DIMENSIONS = [
 ]
 
 class AnalyzePayload(BaseModel):
-    text: str
+    text: str = Field(max_length=MAX_TEXT_CHARS)
 
-@app.get("/health", response_class=JSONResponse)
+@app.get("/health")
 async def health():
     return {"status": "ok"}
 
@@ -31,12 +47,12 @@ async def health():
 async def index(request: Request):
     return templates.TemplateResponse("index.html", {"request": request, "dimensions": DIMENSIONS})
 
-@app.post("/analyze", response_class=JSONResponse)
-async def analyze(payload: AnalyzePayload):
+@app.post("/analyze")
+async def analyze(payload: AnalyzePayload, explain: bool = True):
     try:
-        result = score_with_llm(payload.text or "")
+        result = await score_with_llm(payload.text or "", include_explanations=explain)
         if "error" in result:
-            return JSONResponse(result, status_code=500)
-        return JSONResponse(result)
+            return ORJSONResponse(result, status_code=500)
+        return ORJSONResponse(result)
     except Exception as e:
-        return JSONResponse({"error": f"Erro interno na análise: {str(e)}"}, status_code=500)
+        return ORJSONResponse({"error": f"Erro interno na análise: {str(e)}"}, status_code=500)
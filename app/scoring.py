@@ -1,11 +1,45 @@
 import os
-import requests
-import json
+import asyncio
+import hashlib
+import httpx
+import orjson
+from cachetools import TTLCache
 from typing import Dict, Any
 
-def score_with_llm(text: str) -> Dict[str, Any]:
+# Cliente assíncrono compartilhado: reaproveita conexões TCP/TLS (e multiplexa via HTTP/2)
+# com a API do Gemini sem bloquear o event loop. Conexão falha rápido (5s); a leitura
+# tem folga para respostas longas do modelo (60s), sem prender o worker indefinidamente
+_CLIENT = httpx.AsyncClient(
+    http2=True,
+    timeout=httpx.Timeout(60.0, connect=5.0),
+    limits=httpx.Limits(max_connections=50, max_keepalive_connections=10),
+)
+
+# O Gemini cobra por token de entrada; textos maiores são truncados antes do prompt
+MAX_PROMPT_CHARS = 100_000
+
+# Cache das análises já feitas, indexado pelo hash do texto (evita chamar o Gemini de novo
+# para o mesmo manuscrito). É local a cada worker.
+_CACHE: TTLCache = TTLCache(maxsize=2048, ttl=3600)
+
+# Análises em andamento, pelo mesmo hash: pedidos simultâneos do mesmo texto aguardam
+# uma única chamada ao Gemini em vez de abrir uma cada
+_INFLIGHT: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+
+def _cache_key(text: str, include_explanations: bool) -> str:
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+    return f"{int(include_explanations)}:{digest}"
+
+async def close_client() -> None:
+    """
+    Fecha o cliente HTTP compartilhado (chamado no desligamento da aplicação).
+    """
+    await _CLIENT.aclose()
+
+async def score_with_llm(text: str, include_explanations: bool = True) -> Dict[str, Any]:
     """
     Gera uma análise completa do texto usando um LLM (Modelo de Linguagem Grande).
+    Com include_explanations=False o LLM não gera 'explainability', o que reduz a resposta.
     """
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
@@ -13,13 +47,37 @@ def score_with_llm(text: str) -> Dict[str, Any]:
             "error": "Chave de API do Gemini não configurada. Defina a variável de ambiente GEMINI_API_KEY."
         }
 
+    text = text[:MAX_PROMPT_CHARS]
+    key = _cache_key(text, include_explanations)
+    cached = _CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    pending = _INFLIGHT.get(key)
+    if pending is None:
+        pending = asyncio.ensure_future(_request_analysis(text, api_key, key, include_explanations))
+        _INFLIGHT[key] = pending
+        pending.add_done_callback(lambda _: _INFLIGHT.pop(key, None))
+    # shield: se um cliente desconectar, a chamada compartilhada continua para os demais
+    return await asyncio.shield(pending)
+
+async def _request_analysis(text: str, api_key: str, key: str, include_explanations: bool) -> Dict[str, Any]:
+    """
+    Envia o texto ao Gemini e guarda no cache a análise, quando válida.
+    """
+    response_keys = [
+        "'scores': Um objeto com notas de 1 a 100 para 'Relevância e Originalidade', 'Rigor Metodológico', 'Qualidade da Escrita', 'Fundamentação Teórica' e 'Resultados e Discussão'."
+    ]
+    if include_explanations:
+        response_keys.append("'explainability': Um objeto com uma breve explicação para cada nota.")
+    response_keys.append("'recommendations': Uma lista de três a cinco recomendações específicas e acionáveis para melhorar o texto.")
+    key_lines = "\n    ".join(f"{i}. {k}" for i, k in enumerate(response_keys, start=1))
+
     # Prompt para o LLM
     prompt_text = f"""
     Você é um assistente de revisão de pares especializado em artigos acadêmicos brasileiros.
     Analise o seguinte texto e forneça uma resposta em formato JSON com as seguintes chaves:
-    1. 'scores': Um objeto com notas de 1 a 100 para 'Relevância e Originalidade', 'Rigor Metodológico', 'Qualidade da Escrita', 'Fundamentação Teórica' e 'Resultados e Discussão'.
-    2. 'explainability': Um objeto com uma breve explicação para cada nota.
-    3. 'recommendations': Uma lista de três a cinco recomendações específicas e acionáveis para melhorar o texto.
+    {key_lines}
 
     O texto para análise é:
     "{text}"
@@ -30,7 +88,7 @@ def score_with_llm(text: str) -> Dict[str, Any]:
         "Content-Type": "application/json",
         "x-goog-api-key": api_key
     }
-    
+
     data = {
         "contents": [
             {
@@ -44,29 +102,33 @@ def score_with_llm(text: str) -> Dict[str, Any]:
         }
     }
 
+    text_content = ""
     try:
-        response = requests.post(url, headers=headers, data=json.dumps(data))
+        response = await _CLIENT.post(url, headers=headers, content=orjson.dumps(data))
         response.raise_for_status()
-        llm_output = response.json()
-        
+        llm_output = orjson.loads(response.content)
+
         # O LLM retorna o JSON como parte de um texto, precisamos parsear
         text_content = llm_output.get('candidates', [{}])[0].get('content', {}).get('parts', [{}])[0].get('text', '')
-        
+
         if not text_content:
             return {"error": "A resposta do LLM não contém texto."}
 
         # Tenta carregar o JSON do texto retornado pelo LLM
-        return json.loads(text_content)
+        result = orjson.loads(text_content)
+        # Apenas respostas válidas são guardadas; erros voltam a consultar o LLM
+        _CACHE[key] = result
+        return result
 
-    except requests.exceptions.HTTPError as errh:
+    except httpx.HTTPStatusError as errh:
         return {"error": f"Erro HTTP: {errh.response.text}"}
-    except requests.exceptions.ConnectionError as errc:
+    except httpx.ConnectError as errc:
         return {"error": f"Erro de Conexão: {errc}"}
-    except requests.exceptions.Timeout as errt:
+    except httpx.TimeoutException as errt:
         return {"error": f"Tempo de espera excedido: {errt}"}
-    except requests.exceptions.RequestException as err:
+    except httpx.RequestError as err:
         return {"error": f"Erro geral na requisição: {err}"}
-    except json.JSONDecodeError as jde:
+    except orjson.JSONDecodeError as jde:
         return {"error": f"A resposta do LLM não é um JSON válido: {jde.msg}. Conteúdo recebido: {text_content}"}
     except Exception as e:
         return {"error": f"Erro inesperado no processamento: {e}"}